@@ -0,0 +1,89 @@
+# cython: language_level=3, embedsignature=True
+# Copyright (C) 2018-present Roberto Prevato
+#
+# This module is part of BlackSheep and is released under
+# the MIT License https://opensource.org/licenses/MIT
+
+
+cdef class CRoute
+
+
+cdef class RouteMatch:
+    cdef public object handler
+    cdef public object values
+    cdef CRoute _route
+
+
+cdef class TrieNode
+
+
+cdef class CRoute:
+    cdef object _handler
+    cdef RouteMatch _no_params_match
+    cdef public bytes pattern
+    cdef public bint has_params
+    cdef public list param_names
+    cdef public object _rx
+    cdef public list _segments
+    cdef public bint _fast
+    cdef public tuple _tail
+    cdef public TrieNode _trie
+    cdef tuple _order
+
+    cdef RouteMatch _get_no_params_match(self)
+    cdef RouteMatch _match_fast(self, bytes value, bytes lowered)
+    cdef RouteMatch _match_tail(self, bytes value, bytes lowered)
+    cdef RouteMatch _match_lowered(self, bytes value, bytes lowered)
+    cdef RouteMatch _get_groups_match(
+        self,
+        bytes value,
+        object match,
+        Py_ssize_t offset
+    )
+    cpdef RouteMatch match(self, bytes value)
+
+
+cdef class TrieNode:
+    cdef public dict literals
+    cdef public TrieNode param_child
+    cdef public list tails
+    cdef public CRoute route
+
+    cdef RouteMatch _match(self, bytes value, bytes lowered)
+    cpdef RouteMatch match(self, bytes value)
+
+
+cdef class MethodRoutes:
+    cdef public dict static_routes
+    cdef public TrieNode trie
+    cdef public list regex_routes
+    cdef list _regexes
+    cdef tuple _combined
+    cdef dict _positions
+
+    cdef RouteMatch _get_regex_match(self, bytes value, bytes lowered)
+    cdef RouteMatch _get_best_match(
+        self,
+        RouteMatch trie_match,
+        RouteMatch regex_match
+    )
+    cdef RouteMatch get_match(self, bytes value)
+
+
+cdef class CachedMatch:
+    cdef tuple key
+    cdef RouteMatch match
+    cdef CachedMatch previous
+    cdef CachedMatch next
+
+
+cdef class CRouter:
+    cdef list _buckets
+    cdef dict _extra_buckets
+    cdef public CRoute _fallback
+    cdef dict _matches
+    cdef CachedMatch _recent_matches
+    cdef Py_ssize_t _handlers_version
+
+    cdef RouteMatch _get_match(self, bytes method, bytes value)
+    cpdef RouteMatch get_match(self, object method, object value)
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional, Pattern, Tuple, AnyStr
+
+_LITERAL_SEGMENT: int
+_PARAM_SEGMENT: int
+_MAX_COMBINED_ROUTES: int
+_MAX_CACHED_MATCHES: int
+
+
+class RouteMatch:
+    handler: Any
+    values: Optional[Dict[str, str]]
+
+    def __init__(self, route: "CRoute", values: Optional[Dict[str, bytes]]) -> None:
+        ...
+
+
+class CRoute:
+    handler: Any
+    pattern: bytes
+    has_params: bool
+    param_names: List[str]
+    _rx: Optional[Pattern]
+    _segments: Optional[List[Tuple[int, Any]]]
+    _fast: bool
+    _tail: Optional[Tuple[Optional[bytes], bytes, bytes]]
+    _trie: Optional["TrieNode"]
+
+    def match(self, value: bytes) -> Optional[RouteMatch]:
+        ...
+
+
+class TrieNode:
+    literals: Dict[bytes, "TrieNode"]
+    param_child: Optional["TrieNode"]
+    tails: List[Tuple[bytes, bytes, CRoute]]
+    route: Optional[CRoute]
+
+    def add(self, route: CRoute) -> bool:
+        ...
+
+    def match(self, value: bytes) -> Optional[RouteMatch]:
+        ...
+
+
+class MethodRoutes:
+    static_routes: Dict[bytes, CRoute]
+    trie: Optional[TrieNode]
+    regex_routes: List[CRoute]
+
+    def add(self, route: CRoute) -> None:
+        ...
+
+
+class CRouter:
+    _fallback: Optional[CRoute]
+
+    def _get_bucket(self, method: bytes) -> MethodRoutes:
+        ...
+
+    def _clear_buckets(self) -> None:
+        ...
+
+    def _clear_matches(self) -> None:
+        ...
+
+    def get_match(self, method: AnyStr, value: AnyStr) -> Optional[RouteMatch]:
+        ...
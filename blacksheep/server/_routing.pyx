@@ -0,0 +1,729 @@
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_GET_SIZE
+from libc.string cimport memchr, memcmp
+
+import re
+from urllib.parse import unquote
+
+try:
+    # RE2 guarantees linear time matching, when available
+    import re2 as _regex_engine
+except ImportError:  # pragma: no cover
+    _regex_engine = re
+
+
+_named_group_rx = re.compile(b"\\?P<([^>]+)>")
+
+_LITERAL_SEGMENT = 0
+_PARAM_SEGMENT = 1
+
+# maximum number of routes matched by a single combined regular expression
+_MAX_COMBINED_ROUTES = 200
+
+# number of HTTP methods handled by _get_method_index
+DEF METHODS_COUNT = 9
+
+# maximum number of matches cached by each router
+_MAX_CACHED_MATCHES = 4096
+
+# incremented when the handler of any route changes, to invalidate the matches
+# cached by routers (e.g. when request handlers are normalized)
+cdef Py_ssize_t _handlers_version = 0
+
+
+
+cdef inline bytes _ensure_bytes(object value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    raise ValueError("Expected bytes or str")
+
+
+cdef inline int _get_method_index(bytes method):
+    # returns the index of the bucket of standard HTTP methods, without hashing
+    # the method name; -1 for other methods
+    cdef Py_ssize_t size = PyBytes_GET_SIZE(method)
+    cdef const char *data = PyBytes_AS_STRING(method)
+
+    if size == 3:
+        if memcmp(data, b"GET", 3) == 0:
+            return 0
+        if memcmp(data, b"PUT", 3) == 0:
+            return 1
+    elif size == 4:
+        if memcmp(data, b"POST", 4) == 0:
+            return 2
+        if memcmp(data, b"HEAD", 4) == 0:
+            return 3
+    elif size == 5:
+        if memcmp(data, b"PATCH", 5) == 0:
+            return 4
+        if memcmp(data, b"TRACE", 5) == 0:
+            return 5
+    elif size == 6:
+        if memcmp(data, b"DELETE", 6) == 0:
+            return 6
+    elif size == 7:
+        if memcmp(data, b"OPTIONS", 7) == 0:
+            return 7
+        if memcmp(data, b"CONNECT", 7) == 0:
+            return 8
+    return -1
+
+
+cdef inline bint _has_at(
+    const char *data,
+    Py_ssize_t start,
+    Py_ssize_t end,
+    Py_ssize_t position,
+    bytes fragment
+):
+    # returns True if data[start:end] contains the fragment at the given position
+    cdef Py_ssize_t size = PyBytes_GET_SIZE(fragment)
+    if position < start or position + size > end:
+        return False
+    return memcmp(data + position, PyBytes_AS_STRING(fragment), size) == 0
+
+
+cdef inline Py_ssize_t _get_segment_end(
+    const char *data,
+    Py_ssize_t position,
+    Py_ssize_t size
+):
+    # returns the index of the slash ending the segment starting at the given
+    # position, or the size of the path for its last segment
+    cdef const char *slash = <const char *>memchr(
+        data + position, 47, size - position
+    )
+    if slash is NULL:
+        return size
+    return slash - data
+
+
+cdef tuple _get_route_order(CRoute route):
+    # the catch-all route is tried last, like when routes are sorted; other
+    # routes with fewer parameters are tried first, then routes with more
+    # literal characters, i.e. more specific routes
+    cdef Py_ssize_t literal_size = 0
+    cdef bytes segment
+
+    if route._order is not None:
+        return route._order
+
+    for index, segment in enumerate(route.pattern.split(b"/")):
+        if index == 0 or len(segment) < 2 or not segment.startswith(b":"):
+            literal_size += len(segment) - segment.count(b"*")
+    route._order = (
+        route.pattern == b"*", len(route.param_names), -literal_size
+    )
+    return route._order
+
+
+cdef Py_ssize_t _get_insert_index(list routes, CRoute route):
+    # returns the index at which the given route must be inserted in a list of
+    # routes ordered by specificity, after the ones with the same order
+    cdef tuple order = _get_route_order(route)
+    cdef Py_ssize_t index = len(routes)
+
+    while index > 0 and _get_route_order(routes[index - 1]) > order:
+        index -= 1
+    return index
+
+
+cdef RouteMatch _get_route_match(CRoute route, list values):
+    cdef Py_ssize_t index
+    cdef dict route_values = {}
+
+    for index in range(len(values)):
+        route_values[route.param_names[index]] = values[index]
+    return _new_route_match(route, route_values)
+
+
+cdef class RouteMatch:
+
+    def __init__(self, CRoute route, object values):
+        self.handler = route._handler
+        self.values = _decode_values(values)
+        self._route = route
+
+
+cdef inline object _decode_values(object values):
+    return (
+        {k: unquote(v.decode("utf8")) for k, v in values.items()}
+        if values
+        else None
+    )
+
+
+cdef inline RouteMatch _new_route_match(CRoute route, dict values):
+    # creates a match without the overhead of calling __init__
+    cdef RouteMatch match = RouteMatch.__new__(RouteMatch)
+    match.handler = route._handler
+    match.values = _decode_values(values)
+    match._route = route
+    return match
+
+
+cdef class CRoute:
+
+    @property
+    def handler(self):
+        return self._handler
+
+    @handler.setter
+    def handler(self, value):
+        global _handlers_version
+        self._handler = value
+        self._no_params_match = None
+        _handlers_version += 1
+
+    cdef RouteMatch _get_no_params_match(self):
+        # matches without route values are shared by all requests, since they
+        # are never modified; they are created again when the handler changes,
+        # i.e. when request handlers are normalized at application start
+        if self._no_params_match is None:
+            self._no_params_match = _new_route_match(self, None)
+        return self._no_params_match
+
+    cdef RouteMatch _match_fast(self, bytes value, bytes lowered):
+        cdef Py_ssize_t index, end
+        cdef Py_ssize_t position = 0
+        cdef Py_ssize_t size = len(lowered)
+        cdef const char *data = PyBytes_AS_STRING(lowered)
+        cdef tuple segment
+        cdef list segments = self._segments
+        cdef dict values = {}
+
+        if size > 1 and data[size - 1] == 47:
+            size -= 1
+
+        # NB: segments are scanned by position, to not allocate a list of
+        # parts for each request
+        for index in range(len(segments)):
+            if position > size:
+                return None
+            end = _get_segment_end(data, position, size)
+            segment = segments[index]
+            if segment[0] == _PARAM_SEGMENT:
+                if end == position:
+                    return None
+                # values keep the case of the original path
+                values[segment[1]] = value[position:end]
+            elif (
+                end - position != PyBytes_GET_SIZE(segment[1])
+                or not _has_at(data, position, end, position, segment[1])
+            ):
+                return None
+            position = end + 1
+
+        if position <= size:
+            return None
+        return _new_route_match(self, values)
+
+    cdef RouteMatch _match_tail(self, bytes value, bytes lowered):
+        cdef Py_ssize_t end
+        cdef Py_ssize_t position = 0
+        cdef Py_ssize_t size = len(lowered)
+        cdef const char *data = PyBytes_AS_STRING(lowered)
+        cdef bytes head, prefix, suffix
+
+        head, prefix, suffix = self._tail
+
+        # NB: the head is None for patterns starting with a star sign;
+        # otherwise it is matched as a whole, or followed by a slash
+        if head is not None:
+            position = len(head)
+            if size > position:
+                if data[position] != 47:
+                    return None
+                position += 1
+            elif size < position:
+                return None
+            if not _has_at(data, 0, size, 0, head):
+                return None
+
+        end = _get_tail_end(data, position, size, prefix, suffix)
+        if end == -1:
+            return None
+        return _get_route_match(self, [value[position + len(prefix):end]])
+
+    cdef RouteMatch _match_lowered(self, bytes value, bytes lowered):
+        cdef Py_ssize_t size
+
+        if not self.has_params:
+            # static routes have no regex; they are matched both with a
+            # trailing slash or not, except for the root route
+            size = PyBytes_GET_SIZE(self.pattern)
+            if lowered == self.pattern or (
+                size > 1
+                and PyBytes_GET_SIZE(lowered) == size + 1
+                and lowered[size] == 47
+                and _has_at(
+                    PyBytes_AS_STRING(lowered), 0, size, 0, self.pattern
+                )
+            ):
+                return self._get_no_params_match()
+            return None
+
+        if self._tail is not None:
+            return self._match_tail(value, lowered)
+
+        if self._trie is not None:
+            return self._trie._match(value, lowered)
+
+        if self._fast:
+            return self._match_fast(value, lowered)
+
+        match = self._rx.match(lowered)
+
+        if not match:
+            return None
+
+        return self._get_groups_match(value, match, 0)
+
+    cdef RouteMatch _get_groups_match(
+        self,
+        bytes value,
+        object match,
+        Py_ssize_t offset
+    ):
+        # returns a match with the values of the groups following the given
+        # group index, in the regex match of the lowered path
+        cdef Py_ssize_t index, start, end
+        cdef dict values = {}
+
+        # NB: param_names are in the same order of the groups of the regex
+        for index in range(len(self.param_names)):
+            start, end = match.span(offset + index + 1)
+            values[self.param_names[index]] = value[start:end]
+        return _new_route_match(self, values)
+
+    cpdef RouteMatch match(self, bytes value):
+        return self._match_lowered(value, value.lower())
+
+
+cdef inline Py_ssize_t _get_tail_end(
+    const char *data,
+    Py_ssize_t position,
+    Py_ssize_t size,
+    bytes prefix,
+    bytes suffix
+):
+    # returns the end of the value of a star sign preceded by the given prefix
+    # and followed by the given suffix, at the given position; -1 if the path
+    # does not match
+    cdef Py_ssize_t start, end
+
+    if not _has_at(data, position, size, position, prefix):
+        return -1
+    start = position + len(prefix)
+    end = size
+    if suffix:
+        if _has_at(data, position, size, size - len(suffix), suffix):
+            end -= len(suffix)
+        elif size > position and data[size - 1] == 47 and _has_at(
+            data, position, size - 1, size - 1 - len(suffix), suffix
+        ):
+            end -= len(suffix) + 1
+        else:
+            return -1
+        if end < start:
+            return -1
+    return end
+
+
+cdef RouteMatch _match_tails(
+    TrieNode node,
+    Py_ssize_t position,
+    list values,
+    bytes value,
+    bytes lowered
+):
+    cdef Py_ssize_t size = len(lowered)
+    cdef Py_ssize_t end
+    cdef const char *data = PyBytes_AS_STRING(lowered)
+    cdef bytes prefix, suffix
+    cdef CRoute route
+
+    if position > size:
+        position = size
+
+    for prefix, suffix, route in node.tails:
+        end = _get_tail_end(data, position, size, prefix, suffix)
+        if end == -1:
+            continue
+        values.append(value[position + len(prefix):end])
+        return _get_route_match(route, values)
+    return None
+
+
+cdef RouteMatch _match_node(
+    TrieNode node,
+    Py_ssize_t position,
+    Py_ssize_t size,
+    list values,
+    bytes value,
+    bytes lowered
+):
+    cdef RouteMatch match
+    cdef TrieNode child
+    cdef Py_ssize_t end
+
+    if position <= size:
+        end = _get_segment_end(PyBytes_AS_STRING(lowered), position, size)
+
+        if node.literals:
+            child = node.literals.get(lowered[position:end])
+            if child is not None:
+                match = _match_node(
+                    child, end + 1, size, values, value, lowered
+                )
+                if match is not None:
+                    return match
+
+        if end > position and node.param_child is not None:
+            values.append(value[position:end])
+            match = _match_node(
+                node.param_child, end + 1, size, values, value, lowered
+            )
+            if match is not None:
+                return match
+            values.pop()
+    elif node.route is not None:
+        return _get_route_match(node.route, values)
+
+    if node.tails:
+        return _match_tails(node, position, values, value, lowered)
+    return None
+
+
+cdef class TrieNode:
+    """
+    Node of the segments trie used by the Router to match request paths
+    without running a regular expression for each configured route.
+    """
+
+    def __init__(self):
+        self.literals = {}
+        self.param_child = None
+        self.tails = []
+        self.route = None
+
+    def add(self, CRoute route):
+        """
+        Adds the given route to the trie, returning False if its pattern cannot
+        be represented by segments (i.e. route parameters after a star sign).
+        """
+        cdef bytes pattern = route.pattern
+        cdef bytes head, suffix, segment
+        cdef Py_ssize_t slash
+        cdef tuple tail = None
+        cdef TrieNode node, child
+
+        if b"*" in pattern:
+            head, _, suffix = pattern.partition(b"*")
+            if b"/:" in suffix:
+                return False
+            slash = head.rfind(b"/")
+            segments = head[:slash].split(b"/") if slash > -1 else []
+            tail = (head[slash + 1:], suffix)
+        else:
+            segments = pattern.split(b"/")
+
+        node = self
+        for index, segment in enumerate(segments):
+            # NB: a colon without a name is a literal, like in the regex of
+            # the route
+            if index > 0 and len(segment) > 1 and segment.startswith(b":"):
+                if node.param_child is None:
+                    node.param_child = TrieNode()
+                node = node.param_child
+            else:
+                child = node.literals.get(segment)
+                if child is None:
+                    child = node.literals[segment] = TrieNode()
+                node = child
+
+        if tail is not None:
+            index = _get_insert_index(
+                [other for _, _, other in node.tails], route
+            )
+            node.tails.insert(index, (tail[0], tail[1], route))
+        elif node.route is None:
+            node.route = route
+        return True
+
+    cpdef RouteMatch match(self, bytes value):
+        """
+        Returns a match for the given path, walking the trie from this node.
+        Literal segments have priority over parameters, and parameters over
+        star signs.
+        """
+        return self._match(value, value.lower())
+
+    cdef RouteMatch _match(self, bytes value, bytes lowered):
+        cdef Py_ssize_t size = len(lowered)
+
+        if size > 2 and lowered[size - 1] == 47:
+            # a route is matched both with a trailing slash or not, except for
+            # the root route
+            size -= 1
+
+        return _match_node(self, 0, size, [], value, lowered)
+
+
+cdef tuple _get_combined_regex(list routes):
+    """
+    Returns a single regular expression matching any of the given routes,
+    in order, and a dictionary of the index of the group wrapping each route,
+    to the route itself and the index of the group of its first parameter.
+    """
+    cdef list sources = []
+    cdef dict groups = {}
+    cdef Py_ssize_t index = 1
+    cdef CRoute route
+
+    for route in routes:
+        # NB: named groups are made anonymous, to not repeat their names
+        source = _named_group_rx.sub(b"", route._rx.pattern[1:-1])
+        sources.append(b"((?:" + source + b")$)")
+        groups[index] = (route, index)
+        index += 1 + len(route.param_names)
+
+    source = b"^(?:" + b"|".join(sources) + b")"
+    try:
+        rx = _regex_engine.compile(source)
+    except _regex_engine.error:
+        # i.e. RE2 does not support the syntax of a pattern
+        rx = re.compile(source)
+    return rx, groups
+
+
+cdef class MethodRoutes:
+    """
+    Routes configured for a single HTTP method, indexed for matching.
+    """
+
+    def __init__(self):
+        self.static_routes = {}
+        self.trie = None
+        self.regex_routes = []
+        self._regexes = []
+        self._combined = None
+        self._positions = {}
+
+    def add(self, CRoute route):
+        if not route.has_params:
+            # static routes are matched by dictionary lookup: the HTTP method
+            # is already resolved without hashing by the router, so a single
+            # hash of the lowered path is all a static match costs
+            self.static_routes.setdefault(route.pattern, route)
+            if len(route.pattern) > 1:
+                self.static_routes.setdefault(route.pattern + b"/", route)
+            return
+
+        if b"*" in route.pattern:
+            # the order of registration of routes with a star sign decides
+            # between trie and regex matches with the same order
+            self._positions[route] = len(self._positions)
+
+        if self.trie is None:
+            self.trie = TrieNode()
+        if not self.trie.add(route):
+            # the list of regexes is parallel to the one of routes, to not
+            # access each route while looking for a match
+            index = _get_insert_index(self.regex_routes, route)
+            self.regex_routes.insert(index, route)
+            self._regexes.insert(index, route._rx)
+            self._combined = None
+
+    cdef RouteMatch _get_regex_match(self, bytes value, bytes lowered):
+        cdef CRoute route
+        cdef list regexes
+        cdef dict groups
+        cdef Py_ssize_t index
+
+        if len(self.regex_routes) > _MAX_COMBINED_ROUTES:
+            regexes = self._regexes
+            for index in range(len(regexes)):
+                match = regexes[index].match(lowered)
+                if match:
+                    route = self.regex_routes[index]
+                    return route._get_groups_match(value, match, 0)
+            return None
+
+        if self._combined is None:
+            self._combined = _get_combined_regex(self.regex_routes)
+
+        rx, groups = self._combined
+        match = rx.match(lowered)
+        if not match:
+            return None
+
+        route, index = groups[match.lastindex]
+        return route._get_groups_match(value, match, index)
+
+    cdef RouteMatch get_match(self, bytes value):
+        cdef CRoute route
+        cdef RouteMatch match
+        cdef bytes lowered = value.lower()
+
+        if self.static_routes:
+            route = self.static_routes.get(lowered)
+            if route is not None:
+                return route._get_no_params_match()
+
+        if self.trie is not None:
+            match = self.trie._match(value, lowered)
+            if match is not None:
+                if self.regex_routes and b"*" in match._route.pattern:
+                    # routes with parameters after a star sign are not in the
+                    # trie, and they can be more specific than the star sign
+                    # the trie matched
+                    return self._get_best_match(
+                        match, self._get_regex_match(value, lowered)
+                    )
+                return match
+
+        if self.regex_routes:
+            return self._get_regex_match(value, lowered)
+        return None
+
+    cdef RouteMatch _get_best_match(
+        self,
+        RouteMatch trie_match,
+        RouteMatch regex_match
+    ):
+        if regex_match is None:
+            return trie_match
+
+        if (
+            _get_route_order(regex_match._route),
+            self._positions[regex_match._route],
+        ) < (
+            _get_route_order(trie_match._route),
+            self._positions[trie_match._route],
+        ):
+            return regex_match
+        return trie_match
+
+
+cdef class CachedMatch:
+    """
+    Entry of the cache of matches of a router, in a circular list ordered
+    from the least to the most recently used.
+    """
+
+
+cdef inline void _unlink_cached_match(CachedMatch entry):
+    entry.previous.next = entry.next
+    entry.next.previous = entry.previous
+
+
+cdef inline void _append_cached_match(CachedMatch root, CachedMatch entry):
+    # adds the given entry as the most recently used, before the root
+    entry.previous = root.previous
+    entry.next = root
+    root.previous.next = entry
+    root.previous = entry
+
+
+cdef class CRouter:
+
+    def __cinit__(self):
+        self._buckets = [None] * METHODS_COUNT
+        self._extra_buckets = {}
+        self._fallback = None
+        self._matches = {}
+        self._recent_matches = CachedMatch()
+        self._recent_matches.previous = self._recent_matches
+        self._recent_matches.next = self._recent_matches
+        self._handlers_version = _handlers_version
+
+    def _get_bucket(self, bytes method):
+        """
+        Returns the routes configured for the given HTTP method, creating them
+        if necessary.
+        """
+        cdef int index = _get_method_index(method)
+        cdef MethodRoutes bucket
+
+        if index > -1:
+            bucket = self._buckets[index]
+            if bucket is None:
+                bucket = self._buckets[index] = MethodRoutes()
+        else:
+            bucket = self._extra_buckets.get(method)
+            if bucket is None:
+                bucket = self._extra_buckets[method] = MethodRoutes()
+        return bucket
+
+    def _clear_buckets(self):
+        self._buckets = [None] * METHODS_COUNT
+        self._extra_buckets.clear()
+        self._clear_matches()
+
+    def _clear_matches(self):
+        """
+        Clears the cache of matches, which must be done when routes change.
+        """
+        self._matches.clear()
+        self._recent_matches.previous = self._recent_matches
+        self._recent_matches.next = self._recent_matches
+
+    cdef RouteMatch _get_match(self, bytes method, bytes value):
+        cdef int index = _get_method_index(method)
+        cdef MethodRoutes bucket
+        cdef RouteMatch match
+
+        if index > -1:
+            bucket = self._buckets[index]
+        else:
+            bucket = self._extra_buckets.get(method)
+
+        if bucket is not None:
+            match = bucket.get_match(value)
+            if match is not None:
+                return match
+
+        if self._fallback is None:
+            return None
+
+        return self._fallback._get_no_params_match()
+
+    cpdef RouteMatch get_match(self, object method, object value):
+        cdef bytes method_name = _ensure_bytes(method)
+        cdef bytes path = _ensure_bytes(value)
+        cdef tuple key = (method_name, path)
+        cdef CachedMatch root = self._recent_matches
+        cdef CachedMatch entry
+        cdef RouteMatch match
+
+        if self._handlers_version != _handlers_version:
+            self._clear_matches()
+            self._handlers_version = _handlers_version
+
+        # NB: cached matches are shared by all requests to the same path, and
+        # their values must not be modified
+        entry = self._matches.get(key)
+        if entry is not None:
+            if entry is not root.previous:
+                _unlink_cached_match(entry)
+                _append_cached_match(root, entry)
+            return entry.match
+
+        match = self._get_match(method_name, path)
+
+        if len(self._matches) >= max(_MAX_CACHED_MATCHES, 1):
+            # the least recently used entry is reused for the new match
+            entry = root.next
+            _unlink_cached_match(entry)
+            del self._matches[entry.key]
+        else:
+            entry = CachedMatch()
+
+        entry.key = key
+        entry.match = match
+        self._matches[key] = entry
+        _append_cached_match(root, entry)
+        return match
@@ -3,10 +3,18 @@ import logging
 from abc import abstractmethod
 from collections import defaultdict
 from functools import lru_cache
-from typing import Any, Callable, Dict, List, Optional, AnyStr
-from urllib.parse import unquote
+from typing import Any, Callable, Dict, List, Optional, AnyStr, Pattern, Tuple
+from weakref import WeakValueDictionary
 
 from blacksheep import HttpMethod
+from blacksheep.server._routing import (
+    _LITERAL_SEGMENT,
+    _PARAM_SEGMENT,
+    CRoute,
+    CRouter,
+    RouteMatch,
+    TrieNode,
+)
 from blacksheep.utils import ensure_bytes, ensure_str
 
 __all__ = [
@@ -19,52 +27,93 @@ __all__ = [
 ]
 
 
-_route_all_rx = re.compile(b"\\*")
 _route_param_rx = re.compile(b"/:([^/]+)")
 _mustache_route_param_rx = re.compile(b"/{([^}]+)}")
-_named_group_rx = re.compile(b"\\?P<([^>]+)>")
-_escaped_chars = {b".", b"[", b"]", b"(", b")"}
 
+# characters of route patterns that are escaped in regular expressions
+_escaped_chars = frozenset(b".[]()")
 
-def _get_regex_for_pattern(pattern):
 
-    for c in _escaped_chars:
-        if c in pattern:
-            pattern = pattern.replace(c, b"\\" + c)
-    if b"*" in pattern:
-        # throw exception if a star appears more than once
-        if pattern.count(b"*") > 1:
-            raise ValueError(
-                "A route pattern cannot contain more than one star sign *. "
-                "Multiple star signs are not supported."
-            )
-
-        if b"/*" in pattern:
-            pattern = _route_all_rx.sub(br"?(?P<tail>.*)", pattern)
-        else:
-            pattern = _route_all_rx.sub(br"(?P<tail>.*)", pattern)
-    if b"/:" in pattern:
-        pattern = _route_param_rx.sub(br"/(?P<\1>[^\/]+)", pattern)
-
-    # NB: following code is just to throw user friendly errors;
+def _add_param_name(param_names: List[bytes], param_name: bytes) -> None:
+    # NB: this is just to throw user friendly errors;
     # regex would fail anyway, but with a more complex message
     # 'sre_constants.error: redefinition of group name'
-    # we only return param names as they are useful for other things
-    param_names = []
-    for p in _named_group_rx.finditer(pattern):
-        param_name = p.group(1)
-        if param_name in param_names:
-            raise ValueError(
-                f"cannot have multiple parameters with name: " f"{param_name}"
-            )
-
-        param_names.append(param_name)
-
-    if len(pattern) > 1 and not pattern.endswith(b"*"):
+    if param_name in param_names:
+        raise ValueError(
+            f"cannot have multiple parameters with name: " f"{param_name}"
+        )
+    param_names.append(param_name)
+
+
+@lru_cache(maxsize=1024)
+def _get_source_for_pattern(pattern: bytes) -> Tuple[bytes, Tuple[bytes, ...]]:
+    """
+    Returns the source of the regular expression matching the given route
+    pattern, and the names of its parameters in order, reading the pattern
+    in a single pass.
+    """
+    # throw exception if a star appears more than once
+    if pattern.count(b"*") > 1:
+        raise ValueError(
+            "A route pattern cannot contain more than one star sign *. "
+            "Multiple star signs are not supported."
+        )
+
+    source = bytearray()
+    param_names: List[bytes] = []
+    size = len(pattern)
+    index = 0
+
+    while index < size:
+        char = pattern[index]
+
+        if char == 42:  # *
+            # NB: the slash before a star sign is not optional, like in the
+            # trie used by routers
+            source += b"(?P<tail>.*)"
+            _add_param_name(param_names, b"tail")
+            index += 1
+            continue
+
+        if char == 47 and index + 2 < size and pattern[index + 1] == 58:
+            end = pattern.find(b"/", index + 2)
+            if end == -1:
+                end = size
+            if end > index + 2:
+                param_name = pattern[index + 2 : end]
+                _add_param_name(param_names, param_name)
+                source += b"/(?P<" + param_name + b">[^\\/]+)"
+                index = end
+                continue
+
+        if char in _escaped_chars:
+            source.append(92)  # \
+        source.append(char)
+        index += 1
+
+    if len(source) > 1:
         # NB: the /? at the end, ensures that a route is matched both with
         # a trailing slash or not
-        pattern = pattern + b"/?"
-    return re.compile(b"^" + pattern + b"$", re.IGNORECASE), param_names
+        source += b"/?"
+    return b"^" + bytes(source) + b"$", tuple(param_names)
+
+
+# compiled regexes shared by all routes with the same regex source, for as long
+# as any route uses them
+_regexes: "WeakValueDictionary[bytes, Pattern]" = WeakValueDictionary()
+
+
+def _get_regex_for_pattern(pattern: bytes) -> Tuple[Pattern, Tuple[bytes, ...]]:
+    # NB: regexes are shared, since the same patterns are commonly configured
+    # for more than one HTTP method, and by more than one router
+    source, param_names = _get_source_for_pattern(pattern)
+
+    rx = _regexes.get(source)
+    if rx is None:
+        # NB: patterns are lowercase and they are matched against lowercase
+        # paths, so the regex does not need to ignore case
+        rx = _regexes[source] = re.compile(source)
+    return rx, param_names
 
 
 class RouteException(Exception):
@@ -86,22 +135,9 @@ class RouteDuplicate(RouteException):
         self.current_handler = current_handler
 
 
-class RouteMatch:
-
-    __slots__ = ("values", "handler")
-
-    def __init__(self, route: "Route", values: Optional[Dict[str, bytes]]):
-        self.handler = route.handler
-        self.values: Optional[Dict[str, str]] = (
-            {k: unquote(v.decode("utf8")) for k, v in values.items()}
-            if values
-            else None
-        )
+class Route(CRoute):
 
-
-class Route:
-
-    __slots__ = ("handler", "pattern", "has_params", "param_names", "_rx")
+    __slots__ = ()
 
     pattern: bytes
 
@@ -110,9 +146,61 @@ class Route:
         self.handler = handler
         self.pattern = raw_pattern
         self.has_params = b"*" in raw_pattern or b":" in raw_pattern
-        rx, param_names = _get_regex_for_pattern(raw_pattern)
+        if self.has_params:
+            rx, param_names = _get_regex_for_pattern(raw_pattern)
+        else:
+            # static routes are matched by comparison, without a regex
+            rx, param_names = None, ()
         self._rx = rx
         self.param_names = [name.decode("utf8") for name in param_names]
+        self._segments = self._get_segments(raw_pattern)
+        self._fast = self.has_params and self._segments is not None
+        self._tail = self._get_tail(raw_pattern)
+        self._trie = self._get_trie(raw_pattern)
+
+    def _get_segments(self, pattern: bytes) -> Optional[List[Tuple[int, Any]]]:
+        """
+        Returns the kinds and values of the segments of the given pattern, if it
+        is only made of literal segments and route parameters; otherwise None.
+        """
+        if b"*" in pattern:
+            return None
+        segments: List[Tuple[int, Any]] = []
+        for index, segment in enumerate(pattern.split(b"/")):
+            if index > 0 and len(segment) > 1 and segment.startswith(b":"):
+                segments.append((_PARAM_SEGMENT, segment[1:].decode("utf8")))
+            else:
+                segments.append((_LITERAL_SEGMENT, segment))
+        return segments
+
+    def _get_tail(
+        self, pattern: bytes
+    ) -> Optional[Tuple[Optional[bytes], bytes, bytes]]:
+        """
+        Returns the literal segments before the star sign of the given pattern,
+        the literal before the star sign in the same segment and the one after,
+        if the pattern has no route parameters other than the star; otherwise
+        None.
+        """
+        if b"*" not in pattern or b"/:" in pattern:
+            return None
+        head, _, suffix = pattern.partition(b"*")
+        slash = head.rfind(b"/")
+        if slash == -1:
+            return None, head, suffix
+        return head[:slash], head[slash + 1 :], suffix
+
+    def _get_trie(self, pattern: bytes) -> Optional[TrieNode]:
+        """
+        Returns a trie matching this route like routers do, if its pattern has
+        route parameters before a star sign; otherwise None.
+        """
+        if b"*" not in pattern or self._tail is not None:
+            return None
+        trie = TrieNode()
+        if trie.add(self):
+            return trie
+        return None
 
     def normalize_pattern(self, pattern: AnyStr) -> bytes:
         if isinstance(pattern, str):
@@ -140,19 +228,10 @@ class Route:
 
     @property
     def full_pattern(self) -> bytes:
+        if self._rx is None:
+            return _get_source_for_pattern(self.pattern)[0]
         return self._rx.pattern
 
-    def match(self, value: bytes) -> Optional[RouteMatch]:
-        if not self.has_params and value.lower() == self.pattern:
-            return RouteMatch(self, None)
-
-        match = self._rx.match(value)
-
-        if not match:
-            return None
-
-        return RouteMatch(self, match.groupdict() if self.has_params else None)
-
 
 class RouterBase:
     @abstractmethod
@@ -242,13 +321,16 @@ class RouterBase:
         return self.get_decorator(HttpMethod.PATCH, pattern)
 
 
-class Router(RouterBase):
+class Router(RouterBase, CRouter):
+    """
+    Router matching request paths to routes: the matching itself is
+    implemented by CRouter, in the _routing extension.
+    """
 
-    __slots__ = ("routes", "_map", "_fallback")
+    __slots__ = ("routes", "_map")
 
     def __init__(self):
         self._map = {}
-        self._fallback = None
         self.routes: Dict[bytes, List[Route]] = defaultdict(list)
 
     @property
@@ -259,10 +341,11 @@ class Router(RouterBase):
     def fallback(self, value):
         if not isinstance(value, Route):
             if callable(value):
-                self._fallback = Route(b"*", value)
-                return
-            raise ValueError("fallback must be a Route or a callable")
+                value = Route(b"*", value)
+            else:
+                raise ValueError("fallback must be a Route or a callable")
         self._fallback = value
+        self._clear_matches()
 
     def __iter__(self):
         for key, routes in self.routes.items():
@@ -300,12 +383,25 @@ class Router(RouterBase):
         self.add_route(method_name, new_route)
 
     def add_route(self, method: AnyStr, route: Route):
-        self.routes[ensure_bytes(method)].append(route)
+        method_name = ensure_bytes(method)
+        self.routes[method_name].append(route)
+        self._index_route(method_name, route)
+
+    def _index_route(self, method: bytes, route: Route):
+        self._get_bucket(method).add(route)
+        self._clear_matches()
 
     def sort_routes(self):
         """
         Sorts the current routes in order of dynamic parameters ascending.
         The catch-all route is always placed to the end.
+
+        Sorting no longer decides which route matches a request: static routes
+        have priority, then literal segments over route parameters, and route
+        parameters over star signs; routes with route parameters after a star
+        sign are compared with star signs by number of parameters and literal
+        characters. The order of routes, as registered or sorted, only breaks
+        ties between routes with star signs and the same priority.
         """
         current_routes = self.routes.copy()
 
@@ -316,16 +412,11 @@ class Router(RouterBase):
 
         self.routes = current_routes
 
-    @lru_cache(maxsize=1200)
-    def get_match(self, method: AnyStr, value: AnyStr) -> Optional[RouteMatch]:
-        for route in self.routes[ensure_bytes(method)]:
-            match = route.match(ensure_bytes(value))
-            if match:
-                return match
-        if self._fallback is None:
-            return None
-
-        return RouteMatch(self._fallback, None)
+        # rebuild the indexes, so that routes are indexed in the new order
+        self._clear_buckets()
+        for method, routes in current_routes.items():
+            for route in routes:
+                self._index_route(method, route)
 
 
 class RegisteredRoute:
@@ -78,6 +78,11 @@ setup(
             ["blacksheep/baseapp.c"],
             extra_compile_args=COMPILE_ARGS,
         ),
+        Extension(
+            "blacksheep.server._routing",
+            ["blacksheep/server/_routing.c"],
+            extra_compile_args=COMPILE_ARGS,
+        ),
     ],
     install_requires=[
         "httptools==0.1.*",
@@ -91,6 +96,7 @@ setup(
         "typing_extensions; python_version < '3.8'",
         "python-dateutil==2.8.1",
     ],
+    extras_require={"re2": ["google-re2"]},
     include_package_data=True,
     zip_safe=False,
 )
@@ -54,6 +54,8 @@ class MockHandler:
         (b"/foo/:id/ufo/:b", b"/Foo/223/Ufo/a13", {"id": "223", "b": "a13"}),
         (b"/:a", b"/Something", {"a": "Something"}),
         (b"/{a}", b"/Something", {"a": "Something"}),
+        (b"/:a", b"/Something/", {"a": "Something"}),
+        (b"/foo/:id", b"/foo/hello%20world", {"id": "hello world"}),
         (b"/alive", b"/alive", None),
     ],
 )
@@ -80,6 +82,9 @@ def test_route_repr(pattern: str):
         (b"/foo/:id", b"/fo/123"),
         (b"/foo/:id/ufo/:b", b"/foo/223/uof/a13"),
         (b"/:a", b"/"),
+        (b"/:a", b"//"),
+        (b"/foo/:id", b"/foo/123/456"),
+        (b"/foo/:id", b"/foo/123//"),
     ],
 )
 def test_route_bad_matches(pattern, url):
@@ -89,6 +94,24 @@ def test_route_bad_matches(pattern, url):
     assert match is None
 
 
+@pytest.mark.parametrize(
+    "pattern,url,expected_values",
+    [
+        (b"/:", b"/:", None),
+        (b"/a/:/b", b"/a/:/b", None),
+        (b"/a/:/:b", b"/A/:/x", {"b": "x"}),
+    ],
+)
+def test_route_bare_colon_is_literal(pattern, url, expected_values):
+    route = Route(pattern, mock_handler)
+
+    assert route.match(b"/x") is None
+    assert route.match(b"/a/x/b") is None
+    match = route.match(url)
+    assert match is not None
+    assert match.values == expected_values
+
+
 @pytest.mark.parametrize("pattern", [b"/:a/:a", b"/foo/:a/ufo/:a", b"/:foo/a/:foo"])
 def test_invalid_route_repeated_group_name(pattern):
     with pytest.raises(ValueError):
@@ -643,3 +666,551 @@ def test_route_to_openapi_pattern(route_pattern, expected_pattern):
     route = Route(route_pattern, object())
 
     assert route.mustache_pattern == expected_pattern
+
+
+def test_router_literal_segments_have_priority_over_parameters():
+    router = Router()
+
+    def a():
+        ...
+
+    def b():
+        ...
+
+    router.add_get("/:a/b", a)
+    router.add_get("/x/:c", b)
+
+    m = router.get_match(HttpMethod.GET, b"/x/b")
+    assert m is not None
+    assert m.handler is b
+    assert m.values == {"c": "b"}
+
+    m = router.get_match(HttpMethod.GET, b"/y/b")
+    assert m is not None
+    assert m.handler is a
+    assert m.values == {"a": "y"}
+
+
+def test_router_match_backtracking_parameters():
+    router = Router()
+
+    def a():
+        ...
+
+    def b():
+        ...
+
+    router.add_get("/a/:b/c", a)
+    router.add_get("/:x/:y/e", b)
+
+    m = router.get_match(HttpMethod.GET, b"/a/d/c")
+    assert m is not None
+    assert m.handler is a
+    assert m.values == {"b": "d"}
+
+    m = router.get_match(HttpMethod.GET, b"/A/d/e")
+    assert m is not None
+    assert m.handler is b
+    assert m.values == {"x": "A", "y": "d"}
+
+
+def test_router_match_parameters_after_star():
+    router = Router()
+
+    def a():
+        ...
+
+    router.add_get("/a/*/:b", a)
+
+    m = router.get_match(HttpMethod.GET, b"/a/one/two/three")
+    assert m is not None
+    assert m.handler is a
+    assert m.values == {"tail": "one/two", "b": "three"}
+
+
+@pytest.mark.parametrize("max_combined_routes", [200, 1])
+def test_router_parameters_after_star_have_priority_over_catch_all(
+    monkeypatch, max_combined_routes
+):
+    monkeypatch.setattr(
+        "blacksheep.server._routing._MAX_COMBINED_ROUTES", max_combined_routes
+    )
+    router = Router()
+
+    def spa():
+        ...
+
+    def api():
+        ...
+
+    def child():
+        ...
+
+    def any_child():
+        ...
+
+    router.add_get("*", spa)
+    router.add_get("/api/*/:id", api)
+    router.add_get("/api/*/x/:id", child)
+    router.add_get("/:x/*", any_child)
+    router.sort_routes()
+
+    m = router.get_match(HttpMethod.GET, b"/api/cats/1")
+    assert m is not None
+    assert m.handler is api
+    assert m.values == {"tail": "cats", "id": "1"}
+
+    m = router.get_match(HttpMethod.GET, b"/api/cats/x/1")
+    assert m is not None
+    assert m.handler is child
+    assert m.values == {"tail": "cats", "id": "1"}
+
+    m = router.get_match(HttpMethod.GET, b"/cats/1")
+    assert m is not None
+    assert m.handler is any_child
+    assert m.values == {"x": "cats", "tail": "1"}
+
+    m = router.get_match(HttpMethod.GET, b"/")
+    assert m is not None
+    assert m.handler is spa
+
+
+@pytest.mark.parametrize(
+    "pattern,value",
+    [
+        ("/a/*", b"/ab"),
+        ("/a/*/b", b"/a/b"),
+        ("/*/a", b"/a"),
+        ("/:y/*.js", b"/c.js"),
+        ("/a/*/:b", b"/ab/c"),
+        ("/:x/a/*/:b", b"/x/ab/c"),
+    ],
+)
+@pytest.mark.parametrize("max_combined_routes", [200, 1])
+def test_router_star_sign_after_slash_requires_segment(
+    monkeypatch, pattern, value, max_combined_routes
+):
+    # NB: the slash before a star sign is not optional, like it was when
+    # routes were matched by regular expressions
+    monkeypatch.setattr(
+        "blacksheep.server._routing._MAX_COMBINED_ROUTES", max_combined_routes
+    )
+    router = Router()
+    router.add_get(pattern, mock_handler)
+    router.add_get("/unused/*/:unused", mock_handler)
+
+    assert router.get_match(HttpMethod.GET, value) is None
+    assert Route(pattern, mock_handler).match(value) is None
+
+
+@pytest.mark.parametrize("pattern", ["/:", "/a/:/b"])
+def test_router_bare_colon_is_literal(pattern):
+    router = Router()
+    router.add_get(pattern, mock_handler)
+
+    assert router.get_match(HttpMethod.GET, b"/x") is None
+    assert router.get_match(HttpMethod.GET, b"/a/x/b") is None
+
+    m = router.get_match(HttpMethod.GET, pattern.encode())
+    assert m is not None
+    assert m.values is None
+
+
+def test_router_static_routes_match_exactly():
+    router = Router()
+    router.add_get("/a+b", mock_handler)
+
+    assert router.get_match(HttpMethod.GET, b"/a+b") is not None
+    assert router.get_match(HttpMethod.GET, b"/aab") is None
+    assert router.get_match(HttpMethod.GET, b"/ab") is None
+
+
+def test_router_static_routes_have_priority():
+    router = Router()
+
+    def a():
+        ...
+
+    def b():
+        ...
+
+    router.add_get("/:name", a)
+    router.add_get("/about", b)
+
+    for value in (b"/about", b"/About/"):
+        m = router.get_match(HttpMethod.GET, value)
+        assert m is not None
+        assert m.handler is b
+        assert m.values is None
+
+    m = router.get_match(HttpMethod.GET, b"/about//")
+    assert m is None
+
+    m = router.get_match(HttpMethod.GET, b"/contacts")
+    assert m is not None
+    assert m.handler is a
+    assert m.values == {"name": "contacts"}
+
+
+def test_routes_with_same_pattern_share_regex():
+    first = Route("/cats/:cat_id", mock_handler)
+    second = Route("/Cats/{cat_id}/", mock_handler)
+
+    assert first.full_pattern == second.full_pattern
+    assert first._rx is second._rx
+
+
+def test_routes_with_same_pattern_share_regex_while_in_use():
+    first = Route("/cats/:cat_id/friends", mock_handler)
+    others = [Route(f"/dogs{i}/:dog_id", mock_handler) for i in range(1100)]
+    second = Route("/cats/:cat_id/friends", mock_handler)
+
+    assert len(others) == 1100
+    assert first._rx is second._rx
+
+
+@pytest.mark.parametrize("max_combined_routes", [200, 1])
+def test_router_match_many_parameters_after_star(monkeypatch, max_combined_routes):
+    monkeypatch.setattr(
+        "blacksheep.server._routing._MAX_COMBINED_ROUTES", max_combined_routes
+    )
+    router = Router()
+
+    def a():
+        ...
+
+    def b():
+        ...
+
+    def c():
+        ...
+
+    router.add_get("/a/*/:b", a)
+    router.add_get("/b/*/x/:c", b)
+    router.add_get("/b/*/:d", c)
+
+    m = router.get_match(HttpMethod.GET, b"/a/one/two")
+    assert m is not None
+    assert m.handler is a
+    assert m.values == {"tail": "one", "b": "two"}
+
+    m = router.get_match(HttpMethod.GET, b"/B/one/x/two")
+    assert m is not None
+    assert m.handler is b
+    assert m.values == {"tail": "one", "c": "two"}
+
+    m = router.get_match(HttpMethod.GET, b"/b/one/y/two")
+    assert m is not None
+    assert m.handler is c
+    assert m.values == {"tail": "one/y", "d": "two"}
+
+    m = router.get_match(HttpMethod.GET, b"/c/one/two")
+    assert m is None
+
+
+@pytest.mark.parametrize(
+    "pattern,expected_full_pattern",
+    [
+        ("/a.b", b"^/a\\.b/?$"),
+        ("/a/[b]", b"^/a/\\[b\\]/?$"),
+        ("/a/(b)/:c", b"^/a/\\(b\\)/(?P<c>[^\\/]+)/?$"),
+    ],
+)
+def test_route_pattern_escaped_chars(pattern, expected_full_pattern):
+    route = Route(pattern, mock_handler)
+
+    assert route.full_pattern == expected_full_pattern
+    assert route.match(pattern.replace(":c", "x").encode()) is not None
+
+
+@pytest.mark.parametrize(
+    "pattern,value,expected_match",
+    [
+        ("/", b"/", True),
+        ("/", b"//", False),
+        ("/a+b", b"/a+b", True),
+        ("/a+b", b"/A+b/", True),
+        ("/a+b", b"/aab", False),
+        ("/a+b", b"/a+b//", False),
+    ],
+)
+def test_static_route_match_without_regex(pattern, value, expected_match):
+    route = Route(pattern, mock_handler)
+
+    assert route._rx is None
+    assert route.full_pattern == b"^" + route.pattern + (
+        b"/?$" if len(route.pattern) > 1 else b"$"
+    )
+    assert (route.match(value) is not None) is expected_match
+
+
+@pytest.mark.parametrize(
+    "pattern,value,expected_tail",
+    [
+        ("/a/*", b"/a", ""),
+        ("/a/*", b"/a/", ""),
+        ("/a/*", b"/A/B/c/", "B/c/"),
+        ("/a/*", b"/ab", None),
+        ("/a/*.js", b"/a/b/c.JS", "b/c"),
+        ("/a/*.js", b"/a/b/c.css", None),
+        ("/a/x*", b"/a/xyz", "yz"),
+        ("*", b"/a/b", "/a/b"),
+    ],
+)
+def test_tail_route_match_without_regex(pattern, value, expected_tail):
+    route = Route(pattern, mock_handler)
+
+    assert route._tail is not None
+    match = route.match(value)
+    if expected_tail is None:
+        assert match is None
+    else:
+        assert match is not None
+        assert match.values == {"tail": expected_tail}
+
+
+@pytest.mark.parametrize(
+    "pattern,value,expected_values",
+    [
+        ("/:x/a/*", b"/xa/aab/", None),
+        ("/:x/a/*", b"/xa/a/b", {"x": "xa", "tail": "b"}),
+        ("/:y/*.js", b"/c.js", None),
+        ("/:y/*.js", b"/c/D.js", {"y": "c", "tail": "D"}),
+        ("/:z/*/ab", b"/Ab/Ab", None),
+        ("/:z/*/ab", b"/Ab/c/Ab", {"z": "Ab", "tail": "c"}),
+        ("/a/*/:b", b"/a/x/y", {"tail": "x", "b": "y"}),
+    ],
+)
+def test_route_with_parameters_and_star_matches_like_router(
+    pattern, value, expected_values
+):
+    route = Route(pattern, mock_handler)
+    router = Router()
+    router.add_get(pattern, mock_handler)
+
+    for match in (route.match(value), router.get_match(HttpMethod.GET, value)):
+        if expected_values is None:
+            assert match is None
+        else:
+            assert match is not None
+            assert match.values == expected_values
+
+
+@pytest.mark.parametrize(
+    "method", ["GET", "PUT", "POST", "HEAD", "PATCH", "TRACE", "DELETE", "OPTIONS"]
+)
+def test_router_standard_and_custom_methods(method):
+    router = Router()
+
+    def standard():
+        ...
+
+    def custom():
+        ...
+
+    router.add(method, "/:id", standard)
+    router.add("PROPFIND", "/:id", custom)
+
+    m = router.get_match(method, b"/1")
+    assert m is not None
+    assert m.handler is standard
+
+    m = router.get_match(method.encode(), b"/1")
+    assert m is not None
+    assert m.handler is standard
+
+    m = router.get_match(b"PROPFIND", b"/1")
+    assert m is not None
+    assert m.handler is custom
+
+    assert router.get_match(b"CONNECT", b"/1") is None
+    assert router.get_match(method.lower(), b"/1") is None
+
+
+@pytest.mark.parametrize(
+    "pattern,url,expected_values",
+    [
+        ("/a/*", b"/A/One/Two", {"tail": "One/Two"}),
+        ("/a/*.JS", b"/A/One.js", {"tail": "One"}),
+        ("/a/*/:b", b"/A/One/Two", {"tail": "One", "b": "Two"}),
+        ("/A/:b/*", b"/a/One/Two", {"b": "One", "tail": "Two"}),
+    ],
+)
+def test_route_values_keep_the_case_of_the_path(pattern, url, expected_values):
+    route = Route(pattern, mock_handler)
+    match = route.match(url)
+
+    assert match is not None
+    assert match.values == expected_values
+
+    router = Router()
+    router.add_route("GET", route)
+    match = router.get_match("GET", url)
+
+    assert match is not None
+    assert match.values == expected_values
+
+
+@pytest.mark.parametrize(
+    "pattern", ["/:a/:b", "/:b/:a/*", "/x/:z/y/:a", "/:z/*/:a", "/{b}/{a}"]
+)
+def test_route_param_names_follow_regex_groups_order(pattern):
+    route = Route(pattern, mock_handler)
+    groups = sorted(route._rx.groupindex.items(), key=lambda item: item[1])
+
+    assert route.param_names == [name for name, _ in groups]
+
+
+def test_router_reuses_matches_of_routes_without_parameters():
+    router = Router()
+
+    def home():
+        ...
+
+    def normalized_home():
+        ...
+
+    router.add_get("/", home)
+    router.fallback = home
+
+    route = next(iter(router))
+    first_match = route.match(b"/")
+
+    assert route.match(b"/") is first_match
+    assert router.fallback.match(b"/foo") is not first_match
+
+    route.handler = normalized_home
+    second_match = route.match(b"/")
+
+    assert second_match is not first_match
+    assert first_match.handler is home
+    assert second_match.handler is normalized_home
+    assert router.get_match("GET", "/").handler is normalized_home
+    assert router.get_match("POST", "/").handler is home
+
+
+def test_router_combined_regex_falls_back_to_re(monkeypatch):
+    class UnsupportedSyntaxEngine:
+        error = ValueError
+
+        @staticmethod
+        def compile(pattern):
+            raise ValueError("Unsupported syntax")
+
+    monkeypatch.setattr(
+        "blacksheep.server._routing._regex_engine", UnsupportedSyntaxEngine
+    )
+    router = Router()
+
+    def a():
+        ...
+
+    router.add_get("/a/*/:b", a)
+
+    m = router.get_match(HttpMethod.GET, b"/a/one/two")
+    assert m is not None
+    assert m.handler is a
+    assert m.values == {"tail": "one", "b": "two"}
+
+
+def test_router_cached_matches_are_invalidated():
+    router = Router()
+
+    def home():
+        ...
+
+    def normalized_home():
+        ...
+
+    def cat():
+        ...
+
+    def fallback():
+        ...
+
+    router.add_get("/", home)
+
+    assert router.get_match("GET", "/cats/1") is None
+    assert router.get_match("GET", "/").handler is home
+
+    router.add_get("/cats/:cat_id", cat)
+    m = router.get_match("GET", "/cats/1")
+    assert m is not None
+    assert m.handler is cat
+    assert router.get_match("GET", "/cats/1") is m
+
+    router.fallback = fallback
+    assert router.get_match("GET", "/dogs/1").handler is fallback
+
+    next(iter(router)).handler = normalized_home
+    assert router.get_match("GET", "/").handler is normalized_home
+
+
+def test_router_cached_matches_are_limited(monkeypatch):
+    monkeypatch.setattr("blacksheep.server._routing._MAX_CACHED_MATCHES", 2)
+    router = Router()
+
+    def cat():
+        ...
+
+    router.add_get("/cats/:cat_id", cat)
+
+    first = router.get_match("GET", "/cats/1")
+    second = router.get_match("GET", "/cats/2")
+    assert router.get_match("GET", "/cats/1") is first
+
+    # the least recently used match is discarded
+    router.get_match("GET", "/cats/3")
+    assert router.get_match("GET", "/cats/1") is first
+    assert router.get_match("GET", "/cats/2") is not second
+
+
+def test_router_cached_matches_follow_lru_order(monkeypatch):
+    monkeypatch.setattr("blacksheep.server._routing._MAX_CACHED_MATCHES", 4)
+    router = Router()
+    router.add_get("/cats/:cat_id", mock_handler)
+
+    matches = {}
+    for cat_id in (1, 2, 3, 4, 1, 5, 3, 6, 1, 7, 8, 1, 2):
+        path = f"/cats/{cat_id}"
+        match = router.get_match("GET", path)
+        # matches of the four most recently used paths are reused
+        assert (match is matches.get(path)) is (path in list(matches)[-4:])
+        matches.pop(path, None)
+        matches[path] = match
+
+
+def test_router_more_specific_routes_have_priority():
+    router = Router()
+
+    def any_file():
+        ...
+
+    def script():
+        ...
+
+    def x_file():
+        ...
+
+    def any_child():
+        ...
+
+    def x_child():
+        ...
+
+    router.add_get("/a/*", any_file)
+    router.add_get("/a/*.js", script)
+    router.add_get("/a/x*", x_file)
+    router.add_get("/b/*/:d", any_child)
+    router.add_get("/b/*/x/:c", x_child)
+
+    assert router.get_match("GET", "/a/b.css").handler is any_file
+    assert router.get_match("GET", "/a/b.js").handler is script
+    assert router.get_match("GET", "/a/xb.css").handler is x_file
+
+    m = router.get_match("GET", "/b/one/x/two")
+    assert m is not None
+    assert m.handler is x_child
+    assert m.values == {"tail": "one", "c": "two"}
+
+    assert router.get_match("GET", "/b/one/y/two").handler is any_child